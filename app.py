@@ -2,17 +2,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from deepface import DeepFace
-import tempfile
-import os
-from PIL import Image
-import numpy as np
-import cv2
 import time
 from datetime import datetime
 import json
 import base64
 from io import BytesIO
+from deepface_analyzer import (ACTIONS, ARCHIVE_EXTENSIONS, DEFAULT_CASCADE_DETECTOR, DEFAULT_CASCADE_THRESHOLD,
+                               DEFAULT_DETECTOR, StackSampler, Tracer, analyze_image_array, archive_entries,
+                               decode_image, is_archive, load_models, summarize_cascade,
+                               trace_span)
 
 # Page configuration
 st.set_page_config(
@@ -186,11 +184,35 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Upload types: Streamlit only checks the last extension, so archives are
+# listed as 'gz', 'bz2', ... and the full name is checked with is_archive()
+IMAGE_TYPES = ['jpg', 'jpeg', 'png', 'bmp']
+ARCHIVE_TYPES = sorted({ext.rsplit('.', 1)[-1] for ext in ARCHIVE_EXTENSIONS})
+
+# Data Table settings
+TABLE_COLUMNS = {
+    'filename': 'Filename',
+    'age': 'Age',
+    'gender': 'Gender',
+    'gender_confidence': 'Gender Confidence (%)',
+    'race': 'Race/Ethnicity',
+    'race_confidence': 'Race Confidence (%)'
+}
+PAGE_SIZES = [25, 50, 100, 250]
+RESULTS_PER_PAGE = 10
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'JSON Lines': ('jsonl', 'application/x-ndjson')
+}
+
 # Initialize session state
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = []
 if 'webcam_enabled' not in st.session_state:
     st.session_state.webcam_enabled = False
+if 'profile' not in st.session_state:
+    st.session_state.profile = None
 if 'processing_stats' not in st.session_state:
     st.session_state.processing_stats = {
         'total_processed': 0,
@@ -198,33 +220,62 @@ if 'processing_stats' not in st.session_state:
         'success_rate': 0
     }
 
-def analyze_image(image_file, filename=None):
-    """Analyze a single image and return results with confidence scores."""
-    start_time = time.time()
-    try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            tmp_file.write(image_file.read())
-            tmp_path = tmp_file.name
-        
-        # Analyze the image
-        result = DeepFace.analyze(tmp_path, actions=['gender', 'race', 'age'])
-        
-        # Clean up temporary file
-        os.unlink(tmp_path)
-        
-        # Extract results with confidence scores
-        analysis = result[0]
-        
-        # Get confidence scores for race
+def extract_attributes(analysis):
+    """Pull the analyzed attributes and their confidence scores out of a DeepFace result."""
+    result = {}
+    
+    if 'age' in analysis:
+        result['age'] = analysis['age']
+    
+    # Get confidence scores for gender
+    if 'gender' in analysis:
+        gender_scores = analysis['gender']
+        dominant_gender = max(gender_scores, key=gender_scores.get)
+        result['gender'] = dominant_gender
+        result['gender_confidence'] = gender_scores[dominant_gender]
+        result['gender_scores'] = gender_scores
+    
+    # Get confidence scores for race
+    if 'race' in analysis:
         race_scores = analysis['race']
         dominant_race = max(race_scores, key=race_scores.get)
-        race_confidence = race_scores[dominant_race]
+        result['race'] = dominant_race
+        result['race_confidence'] = race_scores[dominant_race]
+        result['race_scores'] = race_scores
+    
+    return result
+
+def analyze_image(image_file, filename=None, actions=ACTIONS, skip_detection=False,
+                  cascade=False, cascade_threshold=DEFAULT_CASCADE_THRESHOLD, tracer=None,
+                  calibrate=False):
+    """Analyze a single image and return results with confidence scores.
+
+    Only the attributes in ``actions`` are estimated and returned. With
+    ``skip_detection`` the image is treated as a pre-aligned face crop; with
+    ``cascade`` low-confidence images are re-run with a heavier detector,
+    and ``calibrate`` also times the heavy path on a fast-path image for the
+    speed-up estimate. With a ``tracer``, the decode/detect/classify steps
+    are recorded as spans.
+    """
+    start_time = time.time()
+    filename = filename or image_file.name
+    try:
+        # Decode the upload in memory and analyze it
+        with trace_span(tracer, 'decode', file=filename):
+            img = decode_image(image_file.read())
+        analysis = analyze_image_array(
+            img,
+            actions=actions,
+            detector_backend='skip' if skip_detection else DEFAULT_DETECTOR,
+            cascade_detector=DEFAULT_CASCADE_DETECTOR if cascade and not skip_detection else None,
+            cascade_threshold=cascade_threshold,
+            tracer=tracer,
+            filename=filename,
+            calibrate=calibrate
+        )
         
-        # Get confidence scores for gender
-        gender_scores = analysis['gender']
-        dominant_gender = max(gender_scores, key=gender_scores.get)
-        gender_confidence = gender_scores[dominant_gender]
+        result = {'filename': filename}
+        result.update(extract_attributes(analysis))
         
         processing_time = time.time() - start_time
         
@@ -234,70 +285,73 @@ def analyze_image(image_file, filename=None):
         current_avg = st.session_state.processing_stats['avg_processing_time']
         st.session_state.processing_stats['avg_processing_time'] = (current_avg * (total - 1) + processing_time) / total
         
-        return {
-            'filename': filename or image_file.name,
-            'age': analysis['age'],
-            'gender': dominant_gender,
-            'gender_confidence': gender_confidence,
-            'race': dominant_race,
-            'race_confidence': race_confidence,
-            'race_scores': race_scores,
-            'gender_scores': gender_scores,
+        result.update({
+            'cascade_path': analysis['cascade_path'],
+            'fast_time': analysis['fast_time'],
+            'full_time': analysis['full_time'],
+            'heavy_time': analysis['heavy_time'],
             'processing_time': processing_time,
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        })
+        return result
         
     except Exception as e:
         st.error(f"Error analyzing image: {str(e)}")
         return None
 
-def analyze_webcam_frame(frame):
-    """Analyze a webcam frame and return results."""
+def analyze_webcam_frame(frame, actions=ACTIONS):
+    """Analyze a webcam frame (BGR array) and return results."""
     try:
-        # Convert frame to PIL Image
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(frame_rgb)
-        
-        # Save frame temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            pil_image.save(tmp_file.name, 'JPEG')
-            tmp_path = tmp_file.name
-        
-        # Analyze the frame
-        result = DeepFace.analyze(tmp_path, actions=['gender', 'race', 'age'])
-        
-        # Clean up temporary file
-        os.unlink(tmp_path)
-        
-        # Extract results
-        analysis = result[0]
-        race_scores = analysis['race']
-        dominant_race = max(race_scores, key=race_scores.get)
-        race_confidence = race_scores[dominant_race]
-        
-        gender_scores = analysis['gender']
-        dominant_gender = max(gender_scores, key=gender_scores.get)
-        gender_confidence = gender_scores[dominant_gender]
-        
-        return {
-            'age': analysis['age'],
-            'gender': dominant_gender,
-            'gender_confidence': gender_confidence,
-            'race': dominant_race,
-            'race_confidence': race_confidence,
-            'race_scores': race_scores,
-            'gender_scores': gender_scores
-        }
+        # Frames are already decoded BGR arrays, so they go straight to the models
+        analysis = analyze_image_array(frame, actions=actions)
+        return extract_attributes(analysis)
         
     except Exception as e:
         return None
 
 def create_advanced_charts(df):
-    """Create advanced interactive charts with more insights."""
+    """Create advanced interactive charts with more insights.
+    
+    Charts for attributes that were not analyzed are returned as None.
+    """
     if df.empty:
         return None, None, None, None
     
+    age_fig = gender_fig = race_fig = time_fig = None
+    has_age = 'age' in df.columns and df['age'].notna().any()
+    has_gender = 'gender' in df.columns and df['gender'].notna().any()
+    has_race = 'race' in df.columns and df['race'].notna().any()
+    
     # Age distribution with confidence overlay
+    if has_age:
+        age_fig = _age_histogram(df)
+    
+    if has_gender:
+        gender_fig = _gender_pie(df)
+    
+    if has_race:
+        race_fig = _race_bar(df)
+    
+    # Processing time analysis
+    if 'processing_time' in df.columns and has_age and has_gender:
+        time_fig = px.scatter(
+            df.dropna(subset=['age', 'gender']),
+            x='age',
+            y='processing_time',
+            color='gender',
+            size='gender_confidence',
+            title="Processing Time vs Age (colored by gender, sized by confidence)",
+            hover_data=['filename'] + (['race', 'race_confidence'] if has_race else [])
+        )
+        time_fig.update_layout(
+            xaxis_title="Age",
+            yaxis_title="Processing Time (seconds)"
+        )
+    
+    return age_fig, gender_fig, race_fig, time_fig
+
+def _age_histogram(df):
+    """Age distribution histogram for the advanced dashboard."""
     age_fig = px.histogram(
         df, 
         x='age', 
@@ -314,8 +368,10 @@ def create_advanced_charts(df):
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)'
     )
-    
-    # Gender distribution with confidence
+    return age_fig
+
+def _gender_pie(df):
+    """Gender distribution pie chart for the advanced dashboard."""
     gender_df = df.groupby('gender').agg({
         'gender_confidence': 'mean',
         'filename': 'count'
@@ -329,8 +385,10 @@ def create_advanced_charts(df):
         color_discrete_sequence=['#ff7f0e', '#2ca02c'],
         hover_data={'Avg Confidence': ':.1f'}
     )
-    
-    # Race distribution with confidence bars
+    return gender_fig
+
+def _race_bar(df):
+    """Race/ethnicity bar chart, colored by average confidence."""
     race_df = df.groupby('race').agg({
         'race_confidence': 'mean',
         'filename': 'count'
@@ -351,26 +409,7 @@ def create_advanced_charts(df):
         yaxis_title="Number of Images",
         showlegend=False
     )
-    
-    # Processing time analysis
-    if 'processing_time' in df.columns:
-        time_fig = px.scatter(
-            df,
-            x='age',
-            y='processing_time',
-            color='gender',
-            size='gender_confidence',
-            title="Processing Time vs Age (colored by gender, sized by confidence)",
-            hover_data=['filename', 'race', 'race_confidence']
-        )
-        time_fig.update_layout(
-            xaxis_title="Age",
-            yaxis_title="Processing Time (seconds)"
-        )
-    else:
-        time_fig = None
-    
-    return age_fig, gender_fig, race_fig, time_fig
+    return race_fig
 
 def create_distribution_charts(df):
     """Create distribution charts for the analysis results."""
@@ -419,6 +458,134 @@ def create_distribution_charts(df):
     
     return age_fig, gender_fig, race_fig
 
+def results_dataframe():
+    """DataFrame of the session's results, rebuilt only when results are added or cleared."""
+    results = st.session_state.analysis_results
+    cache = st.session_state.get('results_df_cache')
+    if cache is None or cache['results'] is not results or cache['count'] != len(results):
+        cache = {'results': results, 'count': len(results), 'df': pd.DataFrame(results)}
+        st.session_state.results_df_cache = cache
+    return cache['df']
+
+def flatten_results(df):
+    """Expand the per-class score dicts into one numeric column per class."""
+    score_columns = [c for c in ('gender_scores', 'race_scores') if c in df.columns]
+    flat_df = df.drop(columns=score_columns)
+    for column in score_columns:
+        prefix = column.replace('_scores', '_score_')
+        scores = pd.DataFrame(
+            [s if isinstance(s, dict) else {} for s in df[column]],
+            index=df.index
+        ).add_prefix(prefix)
+        flat_df = flat_df.join(scores.astype(float))
+    return flat_df
+
+def query_results(df, search='', filters=None, sort_by=None, ascending=True):
+    """Filter and sort the result store, returning the matching rows."""
+    mask = pd.Series(True, index=df.index)
+    if search:
+        mask &= df['filename'].str.contains(search, case=False, regex=False)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= df[column].isin(values)
+    
+    view = df[mask]
+    if sort_by:
+        view = view.sort_values(sort_by, ascending=ascending, kind='mergesort', na_position='last')
+    return view
+
+def build_export(df, fmt):
+    """Serialize ``df`` as a complete export file in the given format.
+    
+    ``st.download_button`` needs the whole file up front, so the export
+    cannot be streamed to the browser; it is built in a single pass, and
+    only on request.
+    """
+    if fmt == 'Parquet':
+        return df.to_parquet(index=False)
+    if fmt == 'CSV':
+        return df.to_csv(index=False).encode('utf-8')
+    # An empty view is an empty file, not a single blank line
+    return df.to_json(orient='records', lines=True).encode('utf-8') if len(df) else b''
+
+def render_data_table(df):
+    """Paginated, filterable view of the results with on-demand export.
+    
+    Only the current page is sent to the browser. Export files are built
+    only when requested and are not kept in the session afterwards.
+    """
+    # Filters and sorting
+    filter_cols = st.columns([2, 1, 1])
+    with filter_cols[0]:
+        search = st.text_input("Filter by filename", key="table_search")
+    filters = {}
+    for column, label, col in (('gender', 'Gender', filter_cols[1]), ('race', 'Race/Ethnicity', filter_cols[2])):
+        if column in df.columns:
+            with col:
+                filters[column] = st.multiselect(label, sorted(df[column].dropna().unique()), key=f"table_{column}")
+    
+    table_columns = {k: v for k, v in TABLE_COLUMNS.items() if k in df.columns}
+    sort_cols = st.columns([2, 1, 1])
+    with sort_cols[0]:
+        sort_by = st.selectbox(
+            "Sort by",
+            [None] + list(table_columns),
+            format_func=lambda c: "Upload order" if c is None else table_columns[c],
+            key="table_sort"
+        )
+    with sort_cols[1]:
+        ascending = st.radio("Order", ["Ascending", "Descending"], horizontal=True, key="table_order") == "Ascending"
+    with sort_cols[2]:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key="table_page_size")
+    
+    view = query_results(df, search, filters, sort_by, ascending)
+    
+    # Pagination: only the current page is handed to st.dataframe. The page
+    # lives in session state only, and goes back to 1 whenever the query changes.
+    query = (search, tuple((k, tuple(v)) for k, v in filters.items()), sort_by, ascending, page_size)
+    total_pages = max(1, -(-len(view) // page_size))
+    if (st.session_state.get('table_query') != query
+            or st.session_state.get('table_page', 1) > total_pages):
+        st.session_state.table_page = 1
+    st.session_state.table_query = query
+    page = st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="table_page")
+    start = (page - 1) * page_size
+    page_df = view.iloc[start:start + page_size]
+    
+    st.dataframe(page_df[list(table_columns)].rename(columns=table_columns), use_container_width=True)
+    st.caption(
+        f"Showing rows {start + 1 if len(view) else 0}-{start + len(page_df)} of {len(view)}"
+        + (f" (filtered from {len(df)})" if len(view) != len(df) else "")
+        + f" · page {page} of {total_pages}"
+    )
+    
+    # Export of the filtered and sorted view, with full score columns
+    st.markdown("#### 📥 Export")
+    export_cols = st.columns([1, 1, 2])
+    with export_cols[0]:
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), key="table_export_format")
+    
+    # The file is offered in the run that built it and not cached, so the
+    # bytes are released on the next rerun
+    data = None
+    with export_cols[1]:
+        if st.button("⚙️ Prepare Export"):
+            with st.spinner(f"Building {fmt} export..."):
+                try:
+                    data = build_export(flatten_results(view), fmt)
+                except ImportError:
+                    st.error("Parquet export requires the pyarrow package")
+    
+    if data is not None:
+        extension, mime = EXPORT_FORMATS[fmt]
+        with export_cols[2]:
+            st.download_button(
+                label=f"📥 Download {fmt} ({len(view)} rows)",
+                data=data,
+                file_name=f"face_analysis_results.{extension}",
+                mime=mime
+            )
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🔍 DeepFace Analyzer</h1>', unsafe_allow_html=True)
@@ -438,29 +605,133 @@ def main():
         if mode == "📁 File Upload":
             uploaded_files = st.file_uploader(
                 "Choose images to analyze",
-                type=['jpg', 'jpeg', 'png', 'bmp'],
+                type=IMAGE_TYPES + ARCHIVE_TYPES,
                 accept_multiple_files=True,
-                help="Upload one or more images containing faces"
+                help="Upload one or more images containing faces, or ZIP/TAR archives of images"
+            )
+            
+            # Analysis options
+            actions = st.multiselect(
+                "Attributes to analyze",
+                options=list(ACTIONS),
+                default=list(ACTIONS),
+                format_func=str.capitalize,
+                help="Only the selected models are run, so fewer attributes means faster analysis"
+            )
+            skip_detection = st.checkbox(
+                "Images are pre-aligned face crops",
+                help="Skip face detection and analyze each image as a face"
+            )
+            cascade = st.checkbox(
+                "Confidence cascade",
+                disabled=skip_detection,
+                help=f"Run a fast detector first and retry with {DEFAULT_CASCADE_DETECTOR} "
+                     "only when confidence is below the threshold"
+            )
+            cascade_threshold = st.slider(
+                "Cascade confidence threshold (%)",
+                min_value=50.0,
+                max_value=100.0,
+                value=DEFAULT_CASCADE_THRESHOLD,
+                step=1.0,
+                disabled=skip_detection or not cascade
+            )
+            profile = st.checkbox(
+                "📈 Profile this run",
+                help="Record per-image decode/detect/classify spans as a Chrome trace"
+            )
+            profile_stacks = st.checkbox(
+                "Sample Python stacks",
+                disabled=not profile,
+                help="Also capture a sampled Python profile in collapsed flame-graph format"
             )
             
-            if uploaded_files:
-                st.success(f"📸 {len(uploaded_files)} image(s) uploaded")
+            if uploaded_files and not actions:
+                st.warning("Select at least one attribute to analyze")
+            
+            elif uploaded_files:
+                st.success(f"📸 {len(uploaded_files)} file(s) uploaded")
                 
                 # Analyze button
                 if st.button("🔍 Analyze Images", type="primary"):
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    for i, uploaded_file in enumerate(uploaded_files):
-                        status_text.text(f"Processing {uploaded_file.name}...")
-                        result = analyze_image(uploaded_file)
-                        if result:
-                            st.session_state.analysis_results.append(result)
-                        progress_bar.progress((i + 1) / len(uploaded_files))
+                    tracer = Tracer() if profile else None
+                    options = {
+                        'actions': [a for a in ACTIONS if a in actions],
+                        'skip_detection': skip_detection,
+                        'cascade': cascade,
+                        'cascade_threshold': cascade_threshold,
+                        'tracer': tracer,
+                        # Time the heavy path once per run, on the first fast-path image
+                        'calibrate': cascade and not skip_detection
+                    }
+                    
+                    # Always stop the sampler, or its thread outlives the run
+                    sampler = StackSampler().start() if profile and profile_stacks else None
+                    try:
+                        if tracer:
+                            # Keep model construction out of the first image's spans
+                            with tracer.span('load models', category='setup'):
+                                load_models(
+                                    options['actions'],
+                                    ('skip' if skip_detection else DEFAULT_DETECTOR,
+                                     DEFAULT_CASCADE_DETECTOR if cascade and not skip_detection else None)
+                                )
+                    
+                        for i, uploaded_file in enumerate(uploaded_files):
+                            if is_archive(uploaded_file.name):
+                                # Stream archive members one at a time, keyed by member name
+                                try:
+                                    with archive_entries(uploaded_file) as entries:
+                                        for member_name, read in entries:
+                                            status_text.text(f"Processing {uploaded_file.name}: {member_name}...")
+                                            result = analyze_image(BytesIO(read()), filename=member_name, **options)
+                                            if result:
+                                                st.session_state.analysis_results.append(result)
+                                                options['calibrate'] &= result['heavy_time'] is None
+                                except Exception as e:
+                                    st.error(f"Error reading archive {uploaded_file.name}: {str(e)}")
+                            elif not uploaded_file.name.lower().endswith(tuple(f".{t}" for t in IMAGE_TYPES)):
+                                st.error(f"Unsupported file {uploaded_file.name}: expected an image or a ZIP/TAR archive")
+                            else:
+                                status_text.text(f"Processing {uploaded_file.name}...")
+                                result = analyze_image(uploaded_file, **options)
+                                if result:
+                                    st.session_state.analysis_results.append(result)
+                                    options['calibrate'] &= result['heavy_time'] is None
+                            progress_bar.progress((i + 1) / len(uploaded_files))
+                    finally:
+                        if sampler:
+                            sampler.stop()
+                    
+                    st.session_state.profile = {
+                        'trace': tracer.dumps(),
+                        'stacks': sampler.dumps() if sampler else None
+                    } if tracer else None
                     
                     status_text.text("Analysis complete!")
                     st.success("✅ All images processed successfully!")
         
+            # Profile of the last analysis run
+            if st.session_state.profile:
+                st.download_button(
+                    label="📥 Download Trace (Chrome JSON)",
+                    data=st.session_state.profile['trace'],
+                    file_name="profile_trace.json",
+                    mime="application/json",
+                    help="Open in chrome://tracing or ui.perfetto.dev"
+                )
+                if st.session_state.profile['stacks']:
+                    st.download_button(
+                        label="📥 Download Stack Samples",
+                        data=st.session_state.profile['stacks'],
+                        file_name="profile_stacks.txt",
+                        mime="text/plain",
+                        help="Collapsed stacks for flamegraph.pl or speedscope"
+                    )
+        
         elif mode == "📹 Webcam Live":
             st.info("🎥 Webcam feature requires camera access")
             if st.button("📹 Start Webcam Analysis", type="primary"):
@@ -484,10 +755,27 @@ def main():
                     st.metric("Success Rate", f"{success_rate:.1f}%")
                 else:
                     st.metric("Success Rate", "N/A")
+            
+            # Cascade path counts, for results analyzed with the cascade on
+            cascaded = [r for r in st.session_state.analysis_results
+                        if r.get('cascade_path') in ('fast', 'full')]
+            if cascaded:
+                st.markdown("### 🪜 Confidence Cascade")
+                summary = summarize_cascade(cascaded)
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Fast Path", summary['fast'])
+                    st.metric("Full Path", summary['full'])
+                with col2:
+                    speedup = summary['speedup']
+                    st.metric("Speed-up", f"{speedup:.2f}x" if speedup is not None else "N/A")
+                if speedup is not None and not summary['calibrated']:
+                    st.caption("Speed-up is likely overstated: the heavy path was only timed on escalated, harder images.")
         
         # Clear results button
         if st.button("🗑️ Clear All Results"):
             st.session_state.analysis_results = []
+            st.session_state.profile = None
             st.session_state.processing_stats = {
                 'total_processed': 0,
                 'avg_processing_time': 0,
@@ -525,8 +813,8 @@ def main():
             """)
     
     else:
-        # Convert results to DataFrame
-        df = pd.DataFrame(st.session_state.analysis_results)
+        # Convert results to DataFrame (cached until the results change)
+        df = results_dataframe()
         
         # Create tabs for different views
         tab1, tab2, tab3 = st.tabs(["📊 Individual Results", "📈 Distribution Charts", "📋 Data Table"])
@@ -534,16 +822,29 @@ def main():
         with tab1:
             st.header("Individual Image Analysis")
             
-            # Display results for each image
-            for i, result in enumerate(st.session_state.analysis_results):
+            # Display results for each image, one page at a time
+            results = st.session_state.analysis_results
+            total_pages = max(1, -(-len(results) // RESULTS_PER_PAGE))
+            if st.session_state.get('results_page', 1) > total_pages:
+                st.session_state.results_page = 1
+            page = st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="results_page")
+            start = (page - 1) * RESULTS_PER_PAGE
+            page_results = results[start:start + RESULTS_PER_PAGE]
+            st.caption(f"Showing images {start + 1}-{start + len(page_results)} of {len(results)} · page {page} of {total_pages}")
+            
+            for result in page_results:
                 with st.expander(f"📷 {result['filename']}", expanded=True):
                     col1, col2 = st.columns([1, 2])
                     
                     with col1:
                         # Display the uploaded image
                         try:
-                            # Re-upload and display the image
-                            st.image(uploaded_files[i], caption=result['filename'], use_column_width=True)
+                            # Re-upload and display the image; archive members have no upload of their own
+                            preview = next((f for f in uploaded_files if f.name == result['filename']), None)
+                            if preview is None:
+                                st.info("Image preview not available")
+                            else:
+                                st.image(preview, caption=result['filename'], use_column_width=True)
                         except:
                             st.info("Image preview not available")
                     
@@ -552,39 +853,45 @@ def main():
                         st.markdown("### Analysis Results")
                         
                         # Age
-                        st.metric(
-                            label="🎂 Age",
-                            value=f"{result['age']} years"
-                        )
+                        if 'age' in result:
+                            st.metric(
+                                label="🎂 Age",
+                                value=f"{result['age']} years"
+                            )
                         
                         # Gender with confidence
-                        st.metric(
-                            label="👤 Gender",
-                            value=result['gender'],
-                            delta=f"{result['gender_confidence']:.1f}% confidence"
-                        )
+                        if 'gender' in result:
+                            st.metric(
+                                label="👤 Gender",
+                                value=result['gender'],
+                                delta=f"{result['gender_confidence']:.1f}% confidence"
+                            )
                         
                         # Race with confidence
-                        st.metric(
-                            label="🌍 Race/Ethnicity",
-                            value=result['race'],
-                            delta=f"{result['race_confidence']:.1f}% confidence"
-                        )
+                        if 'race' in result:
+                            st.metric(
+                                label="🌍 Race/Ethnicity",
+                                value=result['race'],
+                                delta=f"{result['race_confidence']:.1f}% confidence"
+                            )
                         
                         # Detailed confidence scores
-                        st.markdown("#### Detailed Confidence Scores")
-                        
-                        col_gender, col_race = st.columns(2)
-                        
-                        with col_gender:
-                            st.markdown("**Gender Scores:**")
-                            for gender, score in result['gender_scores'].items():
-                                st.write(f"• {gender}: {score:.1f}%")
-                        
-                        with col_race:
-                            st.markdown("**Race Scores:**")
-                            for race, score in result['race_scores'].items():
-                                st.write(f"• {race}: {score:.1f}%")
+                        if 'gender_scores' in result or 'race_scores' in result:
+                            st.markdown("#### Detailed Confidence Scores")
+                            
+                            col_gender, col_race = st.columns(2)
+                            
+                            with col_gender:
+                                if 'gender_scores' in result:
+                                    st.markdown("**Gender Scores:**")
+                                    for gender, score in result['gender_scores'].items():
+                                        st.write(f"• {gender}: {score:.1f}%")
+                            
+                            with col_race:
+                                if 'race_scores' in result:
+                                    st.markdown("**Race Scores:**")
+                                    for race, score in result['race_scores'].items():
+                                        st.write(f"• {race}: {score:.1f}%")
         
         with tab2:
             st.header("Advanced Analytics Dashboard")
@@ -592,18 +899,21 @@ def main():
             # Create and display advanced charts
             age_fig, gender_fig, race_fig, time_fig = create_advanced_charts(df)
             
-            if age_fig:
+            if any(fig is not None for fig in (age_fig, gender_fig, race_fig)):
                 # Top row - Age and Gender
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.plotly_chart(age_fig, use_container_width=True)
+                    if age_fig is not None:
+                        st.plotly_chart(age_fig, use_container_width=True)
                 
                 with col2:
-                    st.plotly_chart(gender_fig, use_container_width=True)
+                    if gender_fig is not None:
+                        st.plotly_chart(gender_fig, use_container_width=True)
                 
                 # Race distribution
-                st.plotly_chart(race_fig, use_container_width=True)
+                if race_fig is not None:
+                    st.plotly_chart(race_fig, use_container_width=True)
                 
                 # Processing time analysis (if available)
                 if time_fig:
@@ -616,23 +926,27 @@ def main():
                 
                 with col1:
                     st.metric("Total Images", len(df))
-                    st.metric("Age Range", f"{df['age'].min()}-{df['age'].max()}")
+                    if age_fig is not None:
+                        st.metric("Age Range", f"{df['age'].min():.0f}-{df['age'].max():.0f}")
                 
                 with col2:
-                    st.metric("Average Age", f"{df['age'].mean():.1f} years")
-                    st.metric("Age Std Dev", f"{df['age'].std():.1f}")
+                    if age_fig is not None:
+                        st.metric("Average Age", f"{df['age'].mean():.1f} years")
+                        st.metric("Age Std Dev", f"{df['age'].std():.1f}")
                 
                 with col3:
-                    most_common_gender = df['gender'].mode().iloc[0] if not df['gender'].mode().empty else "N/A"
-                    avg_gender_conf = df['gender_confidence'].mean()
-                    st.metric("Most Common Gender", most_common_gender)
-                    st.metric("Avg Gender Confidence", f"{avg_gender_conf:.1f}%")
+                    if gender_fig is not None:
+                        most_common_gender = df['gender'].mode().iloc[0] if not df['gender'].mode().empty else "N/A"
+                        avg_gender_conf = df['gender_confidence'].mean()
+                        st.metric("Most Common Gender", most_common_gender)
+                        st.metric("Avg Gender Confidence", f"{avg_gender_conf:.1f}%")
                 
                 with col4:
-                    most_common_race = df['race'].mode().iloc[0] if not df['race'].mode().empty else "N/A"
-                    avg_race_conf = df['race_confidence'].mean()
-                    st.metric("Most Common Race", most_common_race)
-                    st.metric("Avg Race Confidence", f"{avg_race_conf:.1f}%")
+                    if race_fig is not None:
+                        most_common_race = df['race'].mode().iloc[0] if not df['race'].mode().empty else "N/A"
+                        avg_race_conf = df['race_confidence'].mean()
+                        st.metric("Most Common Race", most_common_race)
+                        st.metric("Avg Race Confidence", f"{avg_race_conf:.1f}%")
                 
                 # Performance metrics
                 if 'processing_time' in df.columns:
@@ -650,21 +964,7 @@ def main():
         
         with tab3:
             st.header("Data Table")
-            
-            # Display the raw data
-            display_df = df[['filename', 'age', 'gender', 'gender_confidence', 'race', 'race_confidence']].copy()
-            display_df.columns = ['Filename', 'Age', 'Gender', 'Gender Confidence (%)', 'Race/Ethnicity', 'Race Confidence (%)']
-            
-            st.dataframe(display_df, use_container_width=True)
-            
-            # Download button
-            csv = display_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv,
-                file_name="face_analysis_results.csv",
-                mime="text/csv"
-            )
+            render_data_table(df)
 
 if __name__ == "__main__":
     main()
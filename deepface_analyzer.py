@@ -1,86 +1,941 @@
 import os
+import argparse
+import contextlib
+import functools
+import json
+import posixpath
+import queue
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from collections import Counter
+import cv2
+import numpy as np
 import pandas as pd
 from deepface import DeepFace
+from deepface.detectors import FaceDetector
 
-def analyze_faces(image_folder='faceimages', output_file='output.csv'):
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# Attribute models that can be requested, and the CSV column each one fills
+ACTIONS = ('gender', 'race', 'age')
+ACTION_COLUMNS = {'gender': 'Gender', 'race': 'Race/Ethnicity', 'age': 'Age'}
+
+# Cascade defaults: the cheap detector handles every image first, and only
+# images whose dominant gender/race score falls below the threshold (in %)
+# are re-run with the heavier detector.
+DEFAULT_DETECTOR = 'opencv'
+DEFAULT_CASCADE_DETECTOR = 'retinaface'
+DEFAULT_CASCADE_THRESHOLD = 80.0
+
+# Pipeline defaults: bounded queues keep at most this many items in flight
+# between two stages, so memory stays capped no matter how big the folder is.
+DEFAULT_QUEUE_DEPTH = 8
+DEFAULT_READERS = 2
+DEFAULT_DECODERS = 2
+
+# Default interval between Python stack samples when profiling
+DEFAULT_SAMPLE_INTERVAL = 0.01
+
+# Sentinel passed down the queues once a stage has no more work
+_STOP = object()
+
+
+class SourceError(Exception):
+    """Reading the pipeline's input failed partway through.
+
+    Raised by ``run_pipeline`` once the images fed before the failure have
+    been yielded; the original exception is chained as ``__cause__``.
+    """
+
+
+class Tracer:
+    """Collects timed spans and writes them as Chrome trace-event JSON.
+
+    Each span is a single "complete" event appended to a list, so tracing
+    costs a few microseconds per span and is cheap enough to leave on for
+    full-size runs. Open the output in chrome://tracing or ui.perfetto.dev.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        # Thread idents are reused once a thread exits, so each thread object
+        # gets its own synthetic tid and therefore its own labelled track
+        self._tids = {}
+        self._lock = threading.Lock()
+
+    def _tid(self):
+        thread = threading.current_thread()
+        with self._lock:
+            if thread not in self._tids:
+                self._tids[thread] = len(self._tids) + 1
+            return self._tids[thread]
+
+    def add(self, name, start, duration, category='pipeline', **args):
+        """Record a span from ``time.perf_counter`` start and duration (seconds)."""
+        tid = self._tid()
+        self.events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': duration * 1e6,
+            'pid': self._pid,
+            'tid': tid,
+            'args': args,
+        })
+
+    @contextlib.contextmanager
+    def span(self, name, category='pipeline', **args):
+        """Time the body of a ``with`` block as one span."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, category, **args)
+
+    def to_dict(self):
+        with self._lock:
+            threads = list(self._tids.items())
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid,
+                     'args': {'name': thread.name}}
+                    for thread, tid in threads]
+        return {'traceEvents': metadata + list(self.events), 'displayTimeUnit': 'ms'}
+
+    def dumps(self):
+        return json.dumps(self.to_dict())
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+
+def trace_span(tracer, name, category='pipeline', **args):
+    """``tracer.span(...)``, or a no-op context when ``tracer`` is None."""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.span(name, category, **args)
+
+
+class StackSampler:
+    """Sampling Python profiler for a whole run.
+
+    A background thread snapshots every other thread's stack each
+    ``interval`` seconds, so the overhead does not grow with the amount of
+    Python code executed. Stacks are written in the collapsed format
+    (``thread;outer;...;inner count``) read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def dumps(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.dumps())
+
+
+class StageStats:
+    """Timing counters for one pipeline stage, shared by all of its workers."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_time = 0.0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, busy_time, input_wait, output_wait):
+        with self._lock:
+            self.items += 1
+            self.busy_time += busy_time
+            self.input_wait += input_wait
+            self.output_wait += output_wait
+
+    def as_dict(self, wall_time):
+        capacity = wall_time * self.workers
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items': self.items,
+            'busy_s': self.busy_time,
+            'utilization': self.busy_time / capacity if capacity else 0.0,
+            'input_wait_s': self.input_wait,
+            'output_wait_s': self.output_wait,
+        }
+
+
+class _Stage:
+    """A pool of worker threads applying ``func`` to items from ``in_queue``.
+
+    Items are ``(index, filename, payload, error)`` tuples. Once an item has
+    failed, later stages pass it through untouched so the error reaches the
+    collector with the original filename.
+    """
+
+    def __init__(self, name, func, workers, in_queue, out_queue, downstream_workers,
+                 tracer=None):
+        self.name = name
+        self.func = func
+        self.tracer = tracer
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.downstream_workers = downstream_workers
+        self.stats = StageStats(name, workers)
+        self._remaining = workers
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            wait_start = time.perf_counter()
+            item = self.in_queue.get()
+            input_wait = time.perf_counter() - wait_start
+            if item is _STOP:
+                break
+
+            index, filename, payload, error = item
+            busy_start = time.perf_counter()
+            if error is None:
+                try:
+                    payload = self.func(payload)
+                except Exception as e:
+                    payload, error = None, e
+            busy_time = time.perf_counter() - busy_start
+            if self.tracer is not None and busy_time > 0:
+                self.tracer.add(self.name, busy_start, busy_time, file=filename)
+
+            wait_start = time.perf_counter()
+            self.out_queue.put((index, filename, payload, error))
+            output_wait = time.perf_counter() - wait_start
+            self.stats.record(busy_time, input_wait, output_wait)
+
+        # The last worker to finish tells every downstream worker to stop
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            for _ in range(self.downstream_workers):
+                self.out_queue.put(_STOP)
+
+
+def read_image_bytes(path):
+    """Read the raw (still encoded) bytes of an image file."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def is_archive(name):
+    """Whether ``name`` looks like a ZIP or TAR archive we can stream from."""
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _is_image_member(name):
+    # Skip the resource-fork copies macOS adds when zipping a folder
+    name = posixpath.normpath(name)
+    base = posixpath.basename(name)
+    return (name.lower().endswith(IMAGE_EXTENSIONS)
+            and not name.startswith('__MACOSX/') and not base.startswith('._'))
+
+
+def folder_entries(image_folder):
+    """List ``(filename, read)`` entries for the images in a folder."""
+    return [(f, functools.partial(read_image_bytes, os.path.join(image_folder, f)))
+            for f in os.listdir(image_folder) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def _tar_entries(tar):
+    # Streaming tar members can only be read in order, while the archive is
+    # positioned on them, so the bytes are read here rather than by a reader.
+    # This runs in the pipeline's feed thread and is timed as the 'feed' stage.
+    for member in tar:
+        if member.isfile() and _is_image_member(member.name):
+            data = tar.extractfile(member).read()
+            yield posixpath.normpath(member.name), lambda data=data: data
+
+
+@contextlib.contextmanager
+def archive_entries(archive):
+    """Open a ZIP or TAR archive and yield its image members as entries.
+
+    Members are never extracted to disk. ZIP members are read on demand by
+    the reader threads (``ZipFile`` supports concurrent reads), so only the
+    bytes buffered in the pipeline queues are ever held in memory. TAR
+    archives, compressed or not, are read as a forward-only stream: the
+    entries are a generator that reads each member as it is reached, and
+    the pipeline's bounded source queue keeps it from running ahead.
+
+    Args:
+        archive: Path to the archive, or a seekable binary file object.
+            ZIP is detected from the content; anything else is read as TAR.
+
+    Raises:
+        tarfile.TarError: If the input is neither a ZIP nor a readable TAR
+
+    Yields:
+        list or generator: ``(member_name, read)`` pairs, where ``read()``
+        returns the encoded image bytes and ``member_name`` is normalized
+        the same way for both formats (``./a/b.jpg`` becomes ``a/b.jpg``). A list (with a known length) for
+        ZIP archives, a generator for TAR archives.
+    """
+    is_zip = zipfile.is_zipfile(archive)
+    if not isinstance(archive, (str, os.PathLike)):
+        archive.seek(0)
+
+    if is_zip:
+        with zipfile.ZipFile(archive) as zf:
+            yield [(posixpath.normpath(info.filename), functools.partial(zf.read, info))
+                   for info in zf.infolist()
+                   if not info.is_dir() and _is_image_member(info.filename)]
+    elif isinstance(archive, (str, os.PathLike)):
+        with tarfile.open(archive, mode='r|*') as tar:
+            yield _tar_entries(tar)
+    else:
+        with tarfile.open(fileobj=archive, mode='r|*') as tar:
+            yield _tar_entries(tar)
+
+
+def decode_image(data):
+    """Decode encoded image bytes into a BGR array, as DeepFace expects."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Image could not be decoded")
+    return img
+
+
+def detect_face(img, detector_backend=DEFAULT_DETECTOR):
+    """Detect and align the first face in a decoded image.
+
+    With ``detector_backend='skip'`` the whole image is taken as the face,
+    which is what pre-aligned crops need.
+
+    Returns:
+        dict: ``face`` as a 224x224 BGR uint8 crop ready for the attribute
+        models, plus the ``facial_area`` it was taken from.
+    """
+    faces = DeepFace.extract_faces(img, target_size=(224, 224),
+                                   detector_backend=detector_backend,
+                                   enforce_detection=True, align=True)
+    # extract_faces hands back RGB in [0, 1]; analyze wants BGR pixels
+    face = (faces[0]['face'][:, :, ::-1] * 255).astype(np.uint8)
+    return {'face': face, 'facial_area': faces[0]['facial_area']}
+
+
+def load_models(actions=ACTIONS, detector_backends=(DEFAULT_DETECTOR,)):
+    """Build the attribute and detector models up front.
+
+    DeepFace builds models lazily on first use, so loading them here keeps
+    TensorFlow graph construction out of the first image's timings.
+    """
+    for action in actions:
+        DeepFace.build_model(action.capitalize())
+    for backend in detector_backends:
+        if backend and backend != 'skip':
+            FaceDetector.build_model(backend)
+
+
+def classify_face(detection, actions=ACTIONS):
+    """Run the attribute models on an already detected and aligned face."""
+    result = DeepFace.analyze(detection['face'], actions=list(actions),
+                              detector_backend='skip', enforce_detection=False,
+                              silent=True)
+    return result[0]
+
+
+def analysis_confidence(analysis):
+    """Lowest dominant-class score (%) among the selected classifiers.
+
+    Age is a regression and has no score, so an age-only analysis returns
+    None and is never escalated on confidence alone.
+    """
+    scores = [max(analysis[action].values()) for action in ('gender', 'race')
+              if action in analysis]
+    return min(scores) if scores else None
+
+
+def detect_stage(img, detector_backend=DEFAULT_DETECTOR, cascade=False):
+    """Pipeline detection step.
+
+    In cascade mode a missed face is not an error yet: the decoded image is
+    kept alongside the detection so the heavier detector can retry it.
+    """
+    start = time.perf_counter()
+    try:
+        detection = detect_face(img, detector_backend)
+    except ValueError:
+        if not cascade:
+            raise
+        detection = {'face': None}
+    detection['detect_time'] = time.perf_counter() - start
+    if cascade:
+        detection['image'] = img
+    return detection
+
+
+def classify_stage(detection, actions=ACTIONS, cascade_detector=None,
+                   cascade_threshold=DEFAULT_CASCADE_THRESHOLD, tracer=None, calibrate=False):
+    """Pipeline classification step, including the optional cascade.
+
+    The cheap result is kept when its confidence reaches
+    ``cascade_threshold``; otherwise (or when the cheap detector found no
+    face) the image is detected again with ``cascade_detector`` and
+    re-classified. The heavier detector only ever runs on this thread, so it
+    shares the single-worker guarantee of the attribute models.
+
+    With ``calibrate``, a result kept on the fast path is also timed through
+    the heavy path (and that result discarded), so the cascade speed-up can
+    be estimated even when no input escalates.
+
+    Returns:
+        dict: DeepFace analysis plus ``cascade_path`` (``'direct'`` without a
+        cascade, else ``'fast'`` or ``'full'``), the ``fast_time`` and
+        ``full_time`` spent on each path in seconds, and ``heavy_time``: the
+        calibration time of the heavy path, or None if it was not measured
+    """
+    start = time.perf_counter()
+    analysis = None
+    if detection['face'] is not None:
+        analysis = classify_face(detection, actions)
+    fast_time = detection['detect_time'] + time.perf_counter() - start
+
+    if cascade_detector is None:
+        analysis.update(cascade_path='direct', fast_time=fast_time, full_time=0.0,
+                        heavy_time=None)
+        return analysis
+
+    if analysis is not None:
+        confidence = analysis_confidence(analysis)
+        if confidence is None or confidence >= cascade_threshold:
+            heavy_time = None
+            if calibrate:
+                heavy_time = _time_heavy_path(detection['image'], actions, cascade_detector,
+                                              tracer)
+            analysis.update(cascade_path='fast', fast_time=fast_time, full_time=0.0,
+                            heavy_time=heavy_time)
+            return analysis
+
+    start = time.perf_counter()
+    with trace_span(tracer, 'cascade', detector=cascade_detector):
+        analysis = classify_face(detect_face(detection['image'], cascade_detector), actions)
+    analysis.update(cascade_path='full', fast_time=fast_time,
+                    full_time=time.perf_counter() - start, heavy_time=None)
+    return analysis
+
+
+def _time_heavy_path(img, actions, cascade_detector, tracer=None):
+    # Seconds the heavy detector plus classification take on ``img``, or
+    # None if the heavy detector finds no face in it
+    start = time.perf_counter()
+    with trace_span(tracer, 'calibrate', detector=cascade_detector):
+        try:
+            classify_face(detect_face(img, cascade_detector), actions)
+        except ValueError:
+            return None
+    return time.perf_counter() - start
+
+
+def analyze_image_array(img, actions=ACTIONS, detector_backend=DEFAULT_DETECTOR,
+                        cascade_detector=None, cascade_threshold=DEFAULT_CASCADE_THRESHOLD,
+                        tracer=None, filename=None, calibrate=False):
+    """Analyze one decoded BGR image with the same steps as the pipeline.
+
+    With a ``tracer``, the detect and classify steps are recorded as spans
+    tagged with ``filename``. ``calibrate`` is passed to ``classify_stage``.
+    """
+    with trace_span(tracer, 'detect', file=filename):
+        detection = detect_stage(img, detector_backend, cascade=cascade_detector is not None)
+    with trace_span(tracer, 'classify', file=filename):
+        return classify_stage(detection, actions, cascade_detector, cascade_threshold, tracer,
+                              calibrate)
+
+
+def summarize_cascade(analyses):
+    """Count how many analyses took each cascade path and estimate the speed-up.
+
+    The speed-up compares the time actually spent against running the heavy
+    configuration on every input. The heavy per-image cost is the mean over
+    the escalated inputs and any fast-path inputs timed with ``calibrate``;
+    escalated inputs alone are the harder images, so without a calibration
+    sample the estimate leans high. It is None when neither was measured.
+
+    Returns:
+        dict: ``fast`` and ``full`` path counts, ``speedup``, and
+        ``calibrated``, the number of calibration samples it is based on
+    """
+    fast = sum(1 for a in analyses if a['cascade_path'] == 'fast')
+    full_times = [a['full_time'] for a in analyses if a['cascade_path'] == 'full']
+    calibration = [a['heavy_time'] for a in analyses if a.get('heavy_time') is not None]
+    heavy_times = full_times + calibration
+    spent = sum(a['fast_time'] + a['full_time'] for a in analyses)
+
+    speedup = None
+    if heavy_times and spent:
+        speedup = len(analyses) * (sum(heavy_times) / len(heavy_times)) / spent
+
+    return {'fast': fast, 'full': len(full_times), 'speedup': speedup,
+            'calibrated': len(calibration)}
+
+
+def print_cascade_summary(summary):
+    """Print the cascade path counts and estimated speed-up."""
+    print("\nCascade:")
+    print(f"  Fast path (cheap detector): {summary['fast']}")
+    print(f"  Full path (heavy detector): {summary['full']}")
+    if summary['speedup'] is None:
+        print("  Estimated speed-up vs. heavy-only: n/a (heavy path never timed)")
+    elif summary['calibrated']:
+        print(f"  Estimated speed-up vs. heavy-only: {summary['speedup']:.2f}x")
+    else:
+        print(f"  Estimated speed-up vs. heavy-only: {summary['speedup']:.2f}x "
+              "(likely overstated: heavy cost measured on escalated, harder images only)")
+
+
+def _feed(entries, source, readers, failures, stats, tracer=None):
+    # Time spent producing each entry is recorded as the 'feed' stage: for
+    # streamed TAR archives that is where member bytes are actually read.
+    # Readers must always get their _STOP, even if a streamed archive turns
+    # out to be corrupt halfway through, or the whole pipeline would hang.
+    try:
+        iterator = iter(entries)
+        index = 0
+        while True:
+            busy_start = time.perf_counter()
+            try:
+                filename, read = next(iterator)
+            except StopIteration:
+                break
+            busy_time = time.perf_counter() - busy_start
+            if tracer is not None:
+                tracer.add('feed', busy_start, busy_time, file=filename)
+
+            wait_start = time.perf_counter()
+            source.put((index, filename, read, None))
+            stats.record(busy_time, 0.0, time.perf_counter() - wait_start)
+            index += 1
+    except Exception as e:
+        failures.append(e)
+    finally:
+        for _ in range(readers):
+            source.put(_STOP)
+
+
+def run_pipeline(entries, actions=ACTIONS, detector_backend=DEFAULT_DETECTOR,
+                 cascade_detector=None, cascade_threshold=DEFAULT_CASCADE_THRESHOLD,
+                 queue_depth=DEFAULT_QUEUE_DEPTH, readers=DEFAULT_READERS,
+                 decoders=DEFAULT_DECODERS, tracer=None):
+    """Stream images through read -> decode -> detect -> classify stages.
+
+    Each stage runs in its own threads and hands work to the next through a
+    bounded queue, so file I/O and JPEG decoding overlap with model compute
+    and a slow stage applies backpressure instead of letting work pile up.
+    Detection and classification use a single worker each since the
+    underlying models are shared and not thread-safe.
+
+    Sizes are validated, models loaded and threads started by this call
+    itself, not when the returned generator is first iterated.
+
+    Args:
+        entries (iterable): ``(filename, read)`` pairs to analyze, where
+            ``read()`` returns the encoded image bytes. May be a lazy
+            generator; it is consumed no faster than the pipeline drains.
+        actions (tuple): Attribute models to run on each face
+        detector_backend (str): DeepFace face detector backend, or ``'skip'``
+            for pre-aligned crops
+        cascade_detector (str): Heavier detector for low-confidence images,
+            or None to disable the cascade
+        cascade_threshold (float): Minimum confidence (%) to keep a cheap result
+        queue_depth (int): Maximum items buffered between two stages
+        readers (int): Number of file reader threads
+        decoders (int): Number of image decoder threads
+        tracer (Tracer): Records one span per image per stage, if given
+
+    Returns:
+        generator: Yields ``(index, filename, analysis, error)`` tuples in
+        completion order, where exactly one of ``analysis`` and ``error`` is
+        set. Once exhausted, its ``StopIteration`` value is the list of
+        per-stage statistics (see ``StageStats.as_dict``). Iterating it
+        raises ``SourceError`` if iterating ``entries`` raised, after the
+        images fed before the failure have been yielded.
+
+    Raises:
+        ValueError: If ``queue_depth``, ``readers`` or ``decoders`` is below 1
+    """
+    # A stage with no workers would never pass _STOP on, and a queue depth
+    # of 0 means an unbounded queue, so both are rejected up front
+    for name, value in (('queue_depth', queue_depth), ('readers', readers),
+                        ('decoders', decoders)):
+        if value < 1:
+            raise ValueError(f"{name} must be at least 1, got {value}")
+
+    # Entries are fed from their own thread through a bounded queue, so
+    # streamed archives are read only as fast as the readers keep up
+    source = queue.Queue(maxsize=queue_depth)
+    failures = []
+    feed_stats = StageStats('feed', 1)
+    feeder = threading.Thread(target=_feed,
+                              args=(entries, source, readers, failures, feed_stats, tracer),
+                              name='feed', daemon=True)
+
+    decode_queue = queue.Queue(maxsize=queue_depth)
+    detect_queue = queue.Queue(maxsize=queue_depth)
+    classify_queue = queue.Queue(maxsize=queue_depth)
+    results = queue.Queue(maxsize=queue_depth)
+
+    # With a cascade, the heavy path is timed once on the first image kept on
+    # the fast path, so the speed-up estimate has an unbiased heavy cost.
+    # classify has a single worker, so the flag needs no lock.
+    calibrate = [cascade_detector is not None]
+
+    def classify(detection):
+        analysis = classify_stage(detection, actions, cascade_detector, cascade_threshold,
+                                  tracer, calibrate[0])
+        if analysis['heavy_time'] is not None:
+            calibrate[0] = False
+        return analysis
+
+    stages = [
+        _Stage('read', lambda read: read(), readers, source, decode_queue, decoders,
+               tracer),
+        _Stage('decode', decode_image, decoders, decode_queue, detect_queue, 1, tracer),
+        _Stage('detect',
+               lambda img: detect_stage(img, detector_backend, cascade_detector is not None),
+               1, detect_queue, classify_queue, 1, tracer),
+        _Stage('classify', classify, 1, classify_queue, results, 1, tracer),
+    ]
+
+    with trace_span(tracer, 'load models', category='setup'):
+        load_models(actions, (detector_backend, cascade_detector))
+
+    start = time.perf_counter()
+    feeder.start()
+    for stage in stages:
+        stage.start()
+
+    return _results(results, failures, start, feed_stats, stages)
+
+
+def _results(results, failures, start, feed_stats, stages):
+    # Generator half of run_pipeline, kept separate so that bad arguments
+    # and model loading errors surface at the run_pipeline call itself
+    while True:
+        item = results.get()
+        if item is _STOP:
+            break
+        yield item
+
+    if failures:
+        raise SourceError(failures[0]) from failures[0]
+
+    wall_time = time.perf_counter() - start
+    return ([feed_stats.as_dict(wall_time)]
+            + [stage.stats.as_dict(wall_time) for stage in stages])
+
+
+def print_pipeline_stats(stats):
+    """Print per-stage utilization and queue waits to spot the bottleneck.
+
+    The 'feed' stage lists the input; for TAR archives it also reads the
+    member bytes, so TAR I/O shows up there rather than under 'read'.
+    """
+    print("\nPipeline stages:")
+    print(f"  {'Stage':<10}{'Workers':>8}{'Items':>8}{'Busy':>10}{'Util':>8}"
+          f"{'In-wait':>10}{'Out-wait':>10}")
+    for s in stats:
+        print(f"  {s['stage']:<10}{s['workers']:>8}{s['items']:>8}{s['busy_s']:>9.2f}s"
+              f"{s['utilization']:>7.0%} {s['input_wait_s']:>9.2f}s{s['output_wait_s']:>9.2f}s")
+
+
+def _collect_rows(pipeline, actions, cascade_detector, total=None):
+    """Drain the pipeline into CSV rows, printing progress as results arrive.
+
+    Returns:
+        tuple: ``(rows, analyses, stats, source_error)`` with rows in input
+        order, the successful DeepFace analyses, the per-stage pipeline
+        statistics, and the exception that stopped reading the input early
+        (``stats`` is None in that case), or None
+    """
+    rows = {}
+    analyses = []
+    done = 0
+    stats = source_error = None
+    while True:
+        try:
+            index, filename, result, error = next(pipeline)
+        except StopIteration as stop:
+            stats = stop.value
+            break
+        except SourceError as e:
+            source_error = e.__cause__
+            break
+
+        done += 1
+        print(f"Processed {done}/{total or '?'}: {filename}")
+
+        if error is None:
+            values = {'gender': result.get('dominant_gender'),
+                      'race': result.get('dominant_race'),
+                      'age': result.get('age')}
+            row = [filename] + [values[a] for a in actions]
+            if cascade_detector:
+                row.append(result['cascade_path'])
+            rows[index] = row
+            analyses.append(result)
+            print("  ✓ " + ", ".join(f"{ACTION_COLUMNS[a]}: {values[a]}" for a in actions))
+        else:
+            print(f"  ✗ Error processing image {filename}: {str(error)}")
+            # Still add the filename with error info
+            rows[index] = [filename] + ['Error'] * (len(actions) + bool(cascade_detector))
+
+    return [rows[i] for i in sorted(rows)], analyses, stats, source_error
+
+
+def analyze_faces(image_folder='faceimages', output_file='output.csv', actions=ACTIONS,
+                  detector_backend=DEFAULT_DETECTOR, skip_detection=False,
+                  cascade_detector=None, cascade_threshold=DEFAULT_CASCADE_THRESHOLD,
+                  queue_depth=DEFAULT_QUEUE_DEPTH, readers=DEFAULT_READERS,
+                  decoders=DEFAULT_DECODERS, tracer=None):
     """
     Analyze faces in images using DeepFace and save results to CSV.
-    
+
     Args:
-        image_folder (str): Path to folder containing images
+        image_folder (str): Path to folder containing images, or to a ZIP/TAR
+            archive whose image members are streamed without extraction
         output_file (str): Path for output CSV file
-    
+        actions (tuple): Attributes to estimate, any of ``ACTIONS``
+        detector_backend (str): DeepFace face detector backend
+        skip_detection (bool): Treat every image as a pre-aligned face crop
+        cascade_detector (str): Heavier detector to retry low-confidence
+            images with, or None to run ``detector_backend`` only. Cannot be
+            combined with ``skip_detection``.
+        cascade_threshold (float): Minimum confidence (%) to keep a cheap result
+        queue_depth (int): Maximum images buffered between pipeline stages
+        readers (int): Number of file reader threads
+        decoders (int): Number of image decoder threads
+        tracer (Tracer): Records per-image stage spans and setup/output
+            phases for profiling, if given
+
     Returns:
-        pd.DataFrame: DataFrame containing analysis results
+        pd.DataFrame: DataFrame containing analysis results. Per-stage
+        pipeline statistics are attached as ``df.attrs['pipeline_stats']``
+        (None if reading the input failed partway) and, with a cascade, path counts as ``df.attrs['cascade']``.
     """
-    # Create a list to store data for CSV
-    csv_data = []
-    
+    if skip_detection and cascade_detector:
+        raise ValueError("cascade_detector cannot be combined with skip_detection")
+    if skip_detection:
+        detector_backend = 'skip'
+
     # Check if image folder exists
     if not os.path.exists(image_folder):
         print(f"Error: Image folder '{image_folder}' not found.")
         return None
-    
-    # Get list of image files
-    image_files = [f for f in os.listdir(image_folder) 
-                   if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.tiff'))]
-    
-    if not image_files:
+
+    if os.path.isfile(image_folder) and is_archive(image_folder):
+        source = archive_entries(image_folder)
+    else:
+        source = contextlib.nullcontext(folder_entries(image_folder))
+
+    with contextlib.ExitStack() as stack:
+        try:
+            entries = stack.enter_context(source)
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            print(f"Error: '{image_folder}' is not a readable ZIP/TAR archive ({e}).")
+            return None
+
+        # Streamed TAR archives don't know their size up front
+        total = len(entries) if isinstance(entries, list) else None
+        if total == 0:
+            print(f"No image files found in '{image_folder}'.")
+            return None
+        if total is None:
+            print(f"Streaming images from '{image_folder}'...")
+        else:
+            print(f"Found {total} image(s) to process...")
+
+        pipeline = run_pipeline(entries, actions=actions, detector_backend=detector_backend,
+                                cascade_detector=cascade_detector,
+                                cascade_threshold=cascade_threshold,
+                                queue_depth=queue_depth, readers=readers, decoders=decoders,
+                                tracer=tracer)
+        csv_data, analyses, stats, source_error = _collect_rows(
+            pipeline, actions, cascade_detector, total)
+
+    if source_error is not None:
+        print(f"\nError reading '{image_folder}': {source_error}")
+        if csv_data:
+            print(f"Keeping the {len(csv_data)} image(s) read before the error.")
+
+    if not csv_data:
         print(f"No image files found in '{image_folder}'.")
         return None
-    
-    print(f"Found {len(image_files)} image(s) to process...")
-    
-    # Process each image in the folder
-    for i, filename in enumerate(image_files, 1):
-        image_path = os.path.join(image_folder, filename)
-        print(f"Processing {i}/{len(image_files)}: {filename}")
-        
-        try:
-            # Use deepface to get gender, race, and age
-            result = DeepFace.analyze(image_path, actions=['gender', 'race', 'age'])
-            
-            # Extract gender, race, and age from the result
-            gender = result[0]['gender']
-            race = result[0]['dominant_race']
-            age = result[0]['age']
-            
-            # Append data to the CSV list
-            csv_data.append([filename, gender, race, age])
-            print(f"  ✓ Gender: {gender}, Race: {race}, Age: {age}")
-            
-        except Exception as e:
-            print(f"  ✗ Error processing image {filename}: {str(e)}")
-            # Still add the filename with error info
-            csv_data.append([filename, 'Error', 'Error', 'Error'])
-    
+
     # Create a DataFrame from the CSV data
-    columns = ['Filename', 'Gender', 'Race/Ethnicity', 'Age']
-    df = pd.DataFrame(csv_data, columns=columns)
-    
+    columns = ['Filename'] + [ACTION_COLUMNS[a] for a in actions]
+    if cascade_detector:
+        columns.append('Path')
+    with trace_span(tracer, 'build dataframe', category='pandas'):
+        df = pd.DataFrame(csv_data, columns=columns)
+    df.attrs['pipeline_stats'] = stats
+    if cascade_detector:
+        df.attrs['cascade'] = summarize_cascade(analyses)
+
     # Write data to CSV file
-    df.to_csv(output_file, index=False)
+    with trace_span(tracer, 'write csv', category='pandas'):
+        df.to_csv(output_file, index=False)
     print(f"\nCSV file '{output_file}' created successfully with {len(csv_data)} entries.")
-    
+    if stats is not None:
+        print_pipeline_stats(stats)
+    if cascade_detector:
+        print_cascade_summary(df.attrs['cascade'])
+
     return df
 
-def main():
+def _positive_int(value):
+    """argparse type for counts and sizes that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def _positive_float(value):
+    """argparse type for intervals that must be greater than 0."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+def parse_args(argv=None):
+    """Parse command line arguments for the face analyzer."""
+    parser = argparse.ArgumentParser(description="Analyze faces in a folder of images with DeepFace.")
+    parser.add_argument('image_folder', nargs='?', default='faceimages',
+                        help="Folder or ZIP/TAR archive containing images (default: faceimages)")
+    parser.add_argument('-o', '--output', default='face_analysis_results.csv',
+                        help="Output CSV file (default: face_analysis_results.csv)")
+    parser.add_argument('-a', '--actions', nargs='+', choices=ACTIONS, default=list(ACTIONS),
+                        help="Attributes to estimate (default: all)")
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR,
+                        help=f"Face detector backend (default: {DEFAULT_DETECTOR})")
+    parser.add_argument('--skip-detection', action='store_true',
+                        help="Treat images as pre-aligned face crops and skip detection")
+    parser.add_argument('--cascade', nargs='?', const=DEFAULT_CASCADE_DETECTOR, default=None,
+                        metavar='DETECTOR',
+                        help="Re-run low-confidence images with a heavier detector "
+                             f"(default when given: {DEFAULT_CASCADE_DETECTOR})")
+    parser.add_argument('--cascade-threshold', type=float, default=DEFAULT_CASCADE_THRESHOLD,
+                        help="Minimum gender/race confidence (%%) to accept the cheap result "
+                             f"(default: {DEFAULT_CASCADE_THRESHOLD:g})")
+    parser.add_argument('--queue-depth', type=_positive_int, default=DEFAULT_QUEUE_DEPTH,
+                        help="Maximum images buffered between pipeline stages "
+                             f"(default: {DEFAULT_QUEUE_DEPTH})")
+    parser.add_argument('--readers', type=_positive_int, default=DEFAULT_READERS,
+                        help=f"Number of file reader threads (default: {DEFAULT_READERS})")
+    parser.add_argument('--decoders', type=_positive_int, default=DEFAULT_DECODERS,
+                        help=f"Number of image decoder threads (default: {DEFAULT_DECODERS})")
+    parser.add_argument('--profile', nargs='?', const='profile_trace.json', default=None,
+                        metavar='TRACE_FILE',
+                        help="Record per-image stage spans as Chrome trace-event JSON "
+                             "(default when given: profile_trace.json)")
+    parser.add_argument('--profile-stacks', metavar='STACKS_FILE', default=None,
+                        help="Also sample Python stacks during the run and write them in "
+                             "collapsed flame-graph format")
+    parser.add_argument('--profile-interval', type=_positive_float, default=DEFAULT_SAMPLE_INTERVAL * 1000,
+                        metavar='MS',
+                        help="Stack sampling interval in milliseconds "
+                             f"(default: {DEFAULT_SAMPLE_INTERVAL * 1000:g})")
+    args = parser.parse_args(argv)
+    if args.skip_detection and args.cascade:
+        parser.error("--cascade cannot be combined with --skip-detection")
+    # Keep the requested actions in canonical column order, without repeats
+    args.actions = [a for a in ACTIONS if a in args.actions]
+    return args
+
+def main(argv=None):
     """Main function to run the face analyzer."""
+    args = parse_args(argv)
+
     print("DeepFace Analyzer")
     print("================")
-    
-    # You can modify these paths as needed
-    image_folder = 'faceimages'
-    output_file = 'face_analysis_results.csv'
-    
+
+    tracer = Tracer() if args.profile else None
+    sampler = StackSampler(args.profile_interval / 1000) if args.profile_stacks else None
+
     # Run the analysis
-    results_df = analyze_faces(image_folder, output_file)
-    
+    if sampler:
+        sampler.start()
+    try:
+        results_df = analyze_faces(args.image_folder, args.output, actions=args.actions,
+                                   detector_backend=args.detector,
+                                   skip_detection=args.skip_detection,
+                                   cascade_detector=args.cascade,
+                                   cascade_threshold=args.cascade_threshold,
+                                   queue_depth=args.queue_depth, readers=args.readers,
+                                   decoders=args.decoders, tracer=tracer)
+    finally:
+        if sampler:
+            sampler.stop()
+
+    if tracer:
+        tracer.write(args.profile)
+        print(f"\nTrace written to '{args.profile}' (open in chrome://tracing or ui.perfetto.dev)")
+    if sampler:
+        sampler.write(args.profile_stacks)
+        print(f"Stack samples written to '{args.profile_stacks}'")
+
     if results_df is not None:
+        errors = results_df[ACTION_COLUMNS[args.actions[0]]] == 'Error'
         print(f"\nSummary:")
         print(f"Total images processed: {len(results_df)}")
-        print(f"Successful analyses: {len(results_df[results_df['Gender'] != 'Error'])}")
-        print(f"Errors: {len(results_df[results_df['Gender'] == 'Error'])}")
+        print(f"Successful analyses: {len(results_df[~errors])}")
+        print(f"Errors: {len(results_df[errors])}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+"""Stub out DeepFace and OpenCV so the pipeline can be tested without models.
+
+The stubs stand in for ``cv2.imdecode`` and the DeepFace calls used by
+deepface_analyzer. Image bytes drive their behaviour:
+
+- ``b'bad...'`` cannot be decoded
+- ``b'noface...'`` decodes, but no face is detected
+- ``b'slow...'`` takes noticeably longer to classify than other images
+
+Streamlit and Plotly are replaced too, so ``app`` can be imported for its
+pandas helpers without rendering anything.
+"""
+import os
+import sys
+import time
+import types
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _imdecode(buf, flags):
+    data = bytes(buf)
+    if data.startswith(b'bad'):
+        return None
+    img = np.zeros((4, 4, 3), dtype=np.uint8)
+    if data.startswith(b'noface'):
+        img[0, 0, 0] = 1
+    elif data.startswith(b'slow'):
+        img[0, 0, 0] = 2
+    return img
+
+
+def _extract_faces(img, **kwargs):
+    if img[0, 0, 0] == 1:
+        raise ValueError("Face could not be detected")
+    face = np.zeros((224, 224, 3))
+    face[0, 0, 0] = img[0, 0, 0] / 255
+    return [{'face': face, 'facial_area': {'x': 0, 'y': 0, 'w': 4, 'h': 4}, 'confidence': 1.0}]
+
+
+def _analyze(img, actions, **kwargs):
+    if img[0, 0, 2] == 2:
+        time.sleep(0.05)
+    return [{
+        'age': 30,
+        'gender': {'Woman': 10.0, 'Man': 90.0},
+        'dominant_gender': 'Man',
+        'race': {'white': 85.0, 'asian': 15.0},
+        'dominant_race': 'white',
+    }]
+
+
+cv2 = types.ModuleType('cv2')
+cv2.IMREAD_COLOR = 1
+cv2.imdecode = _imdecode
+
+deepface = types.ModuleType('deepface')
+DeepFace = types.ModuleType('deepface.DeepFace')
+DeepFace.extract_faces = _extract_faces
+DeepFace.analyze = _analyze
+DeepFace.build_model = lambda name: None
+detectors = types.ModuleType('deepface.detectors')
+FaceDetector = types.ModuleType('deepface.detectors.FaceDetector')
+FaceDetector.build_model = lambda backend: None
+deepface.DeepFace = DeepFace
+deepface.detectors = detectors
+detectors.FaceDetector = FaceDetector
+
+sys.modules.setdefault('cv2', cv2)
+sys.modules.setdefault('deepface', deepface)
+sys.modules.setdefault('deepface.DeepFace', DeepFace)
+sys.modules.setdefault('deepface.detectors', detectors)
+sys.modules.setdefault('deepface.detectors.FaceDetector', FaceDetector)
+
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+streamlit = types.ModuleType('streamlit')
+streamlit.set_page_config = lambda *args, **kwargs: None
+streamlit.markdown = lambda *args, **kwargs: None
+streamlit.session_state = _SessionState()
+plotly = types.ModuleType('plotly')
+plotly.express = types.ModuleType('plotly.express')
+plotly.graph_objects = types.ModuleType('plotly.graph_objects')
+
+# app.py renders at import time, so the real Streamlit is always replaced
+sys.modules['streamlit'] = streamlit
+sys.modules['plotly'] = plotly
+sys.modules['plotly.express'] = plotly.express
+sys.modules['plotly.graph_objects'] = plotly.graph_objects
@@ -0,0 +1,91 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from deepface_analyzer import analyze_faces, archive_entries
+
+MEMBERS = {
+    './people/a.jpg': b'ok',
+    'people/b.JPG': b'ok',
+    'people/notes.txt': b'not an image',
+    '__MACOSX/people/._a.jpg': b'bad',
+    'people/._b.jpg': b'bad',
+}
+EXPECTED = ['people/a.jpg', 'people/b.JPG']
+
+
+def _zip(path, members=MEMBERS):
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def _tar(path, members=MEMBERS, mode='w'):
+    with tarfile.open(path, mode) as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def _read_all(archive):
+    with archive_entries(archive) as entries:
+        return [(name, read()) for name, read in entries]
+
+
+@pytest.mark.parametrize('build, name', [(_zip, 'images.zip'), (_tar, 'images.tar')])
+def test_members_are_filtered_and_normalized(tmp_path, build, name):
+    archive = build(tmp_path / name)
+
+    assert _read_all(str(archive)) == [(n, b'ok') for n in EXPECTED]
+
+
+def test_zip_is_listed_and_tar_is_streamed(tmp_path):
+    with archive_entries(str(_zip(tmp_path / 'images.zip'))) as entries:
+        assert isinstance(entries, list)
+    with archive_entries(str(_tar(tmp_path / 'images.tar'))) as entries:
+        assert not isinstance(entries, list)
+
+
+def test_file_objects_are_accepted(tmp_path):
+    for archive in (_zip(tmp_path / 'images.zip'), _tar(tmp_path / 'images.tar')):
+        with open(archive, 'rb') as f:
+            assert [name for name, _ in _read_all(f)] == EXPECTED
+
+
+@pytest.mark.parametrize('build, name', [(_zip, 'images.zip'), (_tar, 'images.tar')])
+def test_analyze_faces_reads_archives(tmp_path, build, name):
+    archive = build(tmp_path / name)
+
+    df = analyze_faces(str(archive), str(tmp_path / 'out.csv'))
+
+    assert df['Filename'].tolist() == EXPECTED
+    assert (df['Gender'] == 'Man').all()
+
+
+def test_truncated_tar_keeps_earlier_rows(tmp_path, capsys):
+    # Random padding keeps gzip from shrinking the members to a few bytes
+    members = {f"img{i}.jpg": b'ok' + os.urandom(4000) for i in range(6)}
+    archive = _tar(tmp_path / 'images.tar.gz', members, mode='w:gz')
+    data = archive.read_bytes()
+    archive.write_bytes(data[:len(data) // 2])
+
+    df = analyze_faces(str(archive), str(tmp_path / 'out.csv'))
+
+    assert 0 < len(df) < len(members)
+    assert df['Filename'].tolist() == list(members)[:len(df)]
+    assert df.attrs['pipeline_stats'] is None
+    assert "Error reading" in capsys.readouterr().out
+
+
+def test_non_archive_zip_returns_none(tmp_path, capsys):
+    archive = tmp_path / 'images.zip'
+    archive.write_bytes(b'this is not an archive')
+
+    assert analyze_faces(str(archive), str(tmp_path / 'out.csv')) is None
+    assert "not a readable ZIP/TAR archive" in capsys.readouterr().out
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import deepface_analyzer
+from deepface_analyzer import (analysis_confidence, analyze_faces, classify_stage, detect_stage,
+                               parse_args)
+
+
+@pytest.fixture
+def detectors(monkeypatch):
+    """Record the detector backend of every extract_faces call.
+
+    The cheap 'opencv' detector misses faces in images marked with 1, the
+    heavier 'retinaface' detector finds them.
+    """
+    extract_faces = deepface_analyzer.DeepFace.extract_faces
+    calls = []
+
+    def recording_extract_faces(img, detector_backend, **kwargs):
+        calls.append(detector_backend)
+        if detector_backend == 'opencv' and img[0, 0, 0] == 1:
+            raise ValueError("Face could not be detected")
+        return extract_faces(np.zeros_like(img), detector_backend=detector_backend, **kwargs)
+
+    monkeypatch.setattr(deepface_analyzer.DeepFace, 'extract_faces', recording_extract_faces)
+    return calls
+
+
+def _set_scores(monkeypatch, gender, race):
+    def analyze(img, actions, **kwargs):
+        result = {}
+        if 'gender' in actions:
+            result.update(gender={'Man': gender, 'Woman': 100 - gender}, dominant_gender='Man')
+        if 'race' in actions:
+            result.update(race={'white': race, 'asian': 100 - race}, dominant_race='white')
+        if 'age' in actions:
+            result['age'] = 30
+        return [result]
+
+    monkeypatch.setattr(deepface_analyzer.DeepFace, 'analyze', analyze)
+
+
+def _image(missed_by_cheap=False):
+    img = np.zeros((4, 4, 3), dtype=np.uint8)
+    if missed_by_cheap:
+        img[0, 0, 0] = 1
+    return img
+
+
+def _cascade(img, actions=('gender', 'race', 'age'), threshold=80.0):
+    detection = detect_stage(img, 'opencv', cascade=True)
+    return classify_stage(detection, actions, 'retinaface', threshold)
+
+
+def test_confident_result_stays_on_fast_path(monkeypatch, detectors):
+    _set_scores(monkeypatch, gender=95.0, race=85.0)
+
+    analysis = _cascade(_image())
+
+    assert analysis['cascade_path'] == 'fast'
+    assert analysis['full_time'] == 0.0
+    assert detectors == ['opencv']
+
+
+def test_low_confidence_escalates(monkeypatch, detectors):
+    # Gender is confident, but the lowest score decides
+    _set_scores(monkeypatch, gender=95.0, race=60.0)
+
+    analysis = _cascade(_image())
+
+    assert analysis['cascade_path'] == 'full'
+    assert detectors == ['opencv', 'retinaface']
+
+
+def test_missed_cheap_detection_escalates(monkeypatch, detectors):
+    _set_scores(monkeypatch, gender=95.0, race=85.0)
+
+    detection = detect_stage(_image(missed_by_cheap=True), 'opencv', cascade=True)
+    assert detection['face'] is None
+
+    analysis = classify_stage(detection, cascade_detector='retinaface')
+    assert analysis['cascade_path'] == 'full'
+    assert analysis['dominant_gender'] == 'Man'
+    assert detectors == ['opencv', 'retinaface']
+
+
+def test_missed_detection_is_an_error_without_cascade(detectors):
+    with pytest.raises(ValueError, match="Face could not be detected"):
+        detect_stage(_image(missed_by_cheap=True), 'opencv')
+
+
+def test_without_cascade_the_path_is_direct(monkeypatch, detectors):
+    _set_scores(monkeypatch, gender=55.0, race=55.0)
+
+    analysis = classify_stage(detect_stage(_image(), 'opencv'))
+
+    assert analysis['cascade_path'] == 'direct'
+    assert detectors == ['opencv']
+
+
+def test_confidence_is_lowest_dominant_score():
+    analysis = {'gender': {'Man': 70.0, 'Woman': 30.0},
+                'race': {'white': 90.0, 'asian': 10.0}, 'age': 30}
+
+    assert analysis_confidence(analysis) == 70.0
+    assert analysis_confidence({'gender': {'Man': 70.0, 'Woman': 30.0}, 'age': 30}) == 70.0
+
+
+def test_age_only_has_no_confidence_and_never_escalates(monkeypatch, detectors):
+    _set_scores(monkeypatch, gender=50.0, race=50.0)
+
+    assert analysis_confidence({'age': 30}) is None
+    analysis = _cascade(_image(), actions=('age',), threshold=100.0)
+    assert analysis['cascade_path'] == 'fast'
+    assert detectors == ['opencv']
+
+
+def test_skip_detection_cannot_be_combined_with_cascade(tmp_path):
+    (tmp_path / 'img.jpg').write_bytes(b'ok')
+
+    with pytest.raises(ValueError, match="skip_detection"):
+        analyze_faces(str(tmp_path), str(tmp_path / 'out.csv'), skip_detection=True,
+                      cascade_detector='retinaface')
+    with pytest.raises(SystemExit):
+        parse_args(['--skip-detection', '--cascade'])
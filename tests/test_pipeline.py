@@ -0,0 +1,166 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import deepface_analyzer
+from deepface_analyzer import (SourceError, Tracer, analyze_faces, parse_args, print_cascade_summary,
+                               run_pipeline, summarize_cascade)
+
+
+def _entries(payloads):
+    return [(f"img{i}.jpg", lambda data=data: data) for i, data in enumerate(payloads)]
+
+
+def _drain(pipeline, timeout=10):
+    """Run a pipeline to completion in a thread so a hang fails the test."""
+    outcome = {'items': []}
+
+    def target():
+        try:
+            while True:
+                outcome['items'].append(next(pipeline))
+        except StopIteration as stop:
+            outcome['stats'] = stop.value
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not shut down"
+    return outcome
+
+
+def test_csv_keeps_input_order(tmp_path):
+    folder = tmp_path / 'images'
+    folder.mkdir()
+    # Slow images finish after the ones queued behind them
+    for i in range(12):
+        (folder / f"img{i:02d}.jpg").write_bytes(b'slow' if i % 3 == 0 else b'ok')
+    output = tmp_path / 'out.csv'
+
+    df = analyze_faces(str(folder), str(output), queue_depth=2, readers=3, decoders=3)
+
+    expected = [f for f in os.listdir(folder) if f.endswith('.jpg')]
+    assert df['Filename'].tolist() == expected
+    assert pd.read_csv(output)['Filename'].tolist() == expected
+    assert [s['items'] for s in df.attrs['pipeline_stats']] == [12] * 5
+
+
+def test_errors_pass_through_with_filenames():
+    outcome = _drain(run_pipeline(_entries([b'ok', b'bad', b'noface', b'ok'])))
+
+    assert 'error' not in outcome
+    items = {filename: (analysis, error) for _, filename, analysis, error in outcome['items']}
+    assert items['img0.jpg'][0]['dominant_gender'] == 'Man'
+    assert items['img0.jpg'][1] is None
+    assert str(items['img1.jpg'][1]) == "Image could not be decoded"
+    assert str(items['img2.jpg'][1]) == "Face could not be detected"
+    assert items['img3.jpg'][1] is None
+
+
+def test_errors_become_error_rows(tmp_path):
+    folder = tmp_path / 'images'
+    folder.mkdir()
+    (folder / 'good.jpg').write_bytes(b'ok')
+    (folder / 'broken.jpg').write_bytes(b'bad')
+
+    df = analyze_faces(str(folder), str(tmp_path / 'out.csv'))
+
+    rows = df.set_index('Filename')
+    assert rows.loc['good.jpg', 'Gender'] == 'Man'
+    assert (rows.loc['broken.jpg'] == 'Error').all()
+
+
+def test_shutdown_when_source_raises():
+    def entries():
+        for i in range(3):
+            yield f"img{i}.jpg", lambda: b'ok'
+        raise OSError("unexpected end of data")
+
+    outcome = _drain(run_pipeline(entries(), queue_depth=1))
+
+    assert len(outcome['items']) == 3
+    assert isinstance(outcome['error'], SourceError)
+    assert isinstance(outcome['error'].__cause__, OSError)
+
+
+def test_analyze_faces_reports_source_error(tmp_path, monkeypatch, capsys):
+    def failing_entries(folder):
+        def entries():
+            yield 'first.jpg', lambda: b'ok'
+            raise OSError("unexpected end of data")
+        return entries()
+
+    monkeypatch.setattr(deepface_analyzer, 'folder_entries', failing_entries)
+
+    df = analyze_faces(str(tmp_path), str(tmp_path / 'out.csv'))
+
+    assert df['Filename'].tolist() == ['first.jpg']
+    assert df.attrs['pipeline_stats'] is None
+    assert "unexpected end of data" in capsys.readouterr().out
+
+
+def test_analyze_faces_propagates_model_errors(tmp_path, monkeypatch):
+    # Only input failures are reported as read errors; anything else is a bug
+    # or a setup problem the caller needs to see
+    (tmp_path / 'img.jpg').write_bytes(b'ok')
+
+    def failing_load(*args):
+        raise ValueError("invalid detector_backend passed - nope")
+
+    monkeypatch.setattr(deepface_analyzer, 'load_models', failing_load)
+
+    with pytest.raises(ValueError, match="invalid detector_backend"):
+        analyze_faces(str(tmp_path), str(tmp_path / 'out.csv'))
+
+
+@pytest.mark.parametrize('option', ['queue_depth', 'readers', 'decoders'])
+def test_zero_sizes_are_rejected(option):
+    with pytest.raises(ValueError, match=option):
+        run_pipeline(_entries([b'ok']), **{option: 0})
+
+
+@pytest.mark.parametrize('option', ['queue_depth', 'readers', 'decoders'])
+def test_analyze_faces_rejects_zero_sizes(tmp_path, option):
+    (tmp_path / 'img.jpg').write_bytes(b'ok')
+
+    with pytest.raises(ValueError, match=option):
+        analyze_faces(str(tmp_path), str(tmp_path / 'out.csv'), **{option: 0})
+
+
+@pytest.mark.parametrize('flag', ['--queue-depth', '--readers', '--decoders'])
+def test_cli_rejects_zero_sizes(flag):
+    with pytest.raises(SystemExit):
+        parse_args([flag, '0'])
+
+
+def test_trace_gives_each_worker_its_own_track():
+    tracer = Tracer()
+    _drain(run_pipeline(_entries([b'ok'] * 5), tracer=tracer))
+
+    trace = tracer.to_dict()
+    tracks = {e['tid']: e['args']['name'] for e in trace['traceEvents'] if e['ph'] == 'M'}
+    assert len(set(tracks.values())) == len(tracks)
+    for event in trace['traceEvents']:
+        if event['ph'] == 'X' and event['cat'] == 'pipeline':
+            # Every stage span sits on a track named after one of its workers
+            assert tracks[event['tid']].split('-')[0] == event['name']
+
+
+def test_cascade_speedup_without_escalation(capsys):
+    outcome = _drain(run_pipeline(_entries([b'ok'] * 4), cascade_detector='retinaface'))
+
+    analyses = [analysis for _, _, analysis, _ in outcome['items']]
+    assert [a['cascade_path'] for a in analyses] == ['fast'] * 4
+    # Only the first fast-path image is timed through the heavy path
+    assert sum(a['heavy_time'] is not None for a in analyses) == 1
+
+    summary = summarize_cascade(analyses)
+    assert summary['full'] == 0 and summary['calibrated'] == 1
+    assert summary['speedup'] is not None
+
+    print_cascade_summary(summary)
+    assert "n/a" not in capsys.readouterr().out
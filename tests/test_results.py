@@ -0,0 +1,79 @@
+import io
+
+import pandas as pd
+import pytest
+
+from app import EXPORT_FORMATS, build_export, flatten_results, query_results
+
+RESULTS = [
+    {'filename': 'b.jpg', 'age': 41, 'gender': 'Man', 'gender_confidence': 90.0,
+     'gender_scores': {'Man': 90.0, 'Woman': 10.0},
+     'race': 'white', 'race_confidence': 70.0,
+     'race_scores': {'white': 70.0, 'asian': 30.0}},
+    {'filename': 'A.jpg', 'age': 25, 'gender': 'Woman', 'gender_confidence': 80.0,
+     'gender_scores': {'Man': 20.0, 'Woman': 80.0},
+     'race': 'asian', 'race_confidence': 60.0,
+     'race_scores': {'white': 40.0, 'asian': 60.0}},
+    # Age-only analysis: no gender or race at all
+    {'filename': 'c.png', 'age': 33},
+]
+
+
+def _readers():
+    return {
+        'CSV': lambda data: pd.read_csv(io.BytesIO(data)),
+        'Parquet': lambda data: pd.read_parquet(io.BytesIO(data)),
+        'JSON Lines': lambda data: pd.read_json(io.BytesIO(data), lines=True),
+    }
+
+
+def test_flatten_results_expands_scores():
+    flat = flatten_results(pd.DataFrame(RESULTS))
+
+    assert 'gender_scores' not in flat and 'race_scores' not in flat
+    assert flat['gender_score_Woman'].tolist()[:2] == [10.0, 80.0]
+    assert flat['race_score_asian'].tolist()[:2] == [30.0, 60.0]
+    # Rows without gender/race get NaN scores rather than breaking the columns
+    assert flat.loc[2, ['gender_score_Man', 'race_score_white']].isna().all()
+
+
+def test_query_results_search_filter_and_sort():
+    df = pd.DataFrame(RESULTS)
+
+    assert query_results(df, search='a.JPG')['filename'].tolist() == ['A.jpg']
+    assert query_results(df, filters={'gender': ['Woman']})['filename'].tolist() == ['A.jpg']
+    # Empty filter selections do not filter
+    assert len(query_results(df, filters={'gender': [], 'race': []})) == 3
+
+    by_age = query_results(df, sort_by='age', ascending=False)
+    assert by_age['filename'].tolist() == ['b.jpg', 'c.png', 'A.jpg']
+    # Rows missing the sort column go last either way
+    by_race = query_results(df, sort_by='race', ascending=False)
+    assert by_race['filename'].tolist() == ['b.jpg', 'A.jpg', 'c.png']
+
+
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+def test_export_round_trip(fmt):
+    if fmt == 'Parquet':
+        pytest.importorskip('pyarrow')
+    flat = flatten_results(pd.DataFrame(RESULTS))
+
+    restored = _readers()[fmt](build_export(flat, fmt))
+
+    pd.testing.assert_frame_equal(restored, flat, check_dtype=False)
+
+
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+def test_export_of_empty_view(fmt):
+    if fmt == 'Parquet':
+        pytest.importorskip('pyarrow')
+    flat = flatten_results(query_results(pd.DataFrame(RESULTS), search='no such file'))
+
+    data = build_export(flat, fmt)
+
+    if fmt == 'JSON Lines':
+        assert data == b''
+    else:
+        restored = _readers()[fmt](data)
+        assert restored.empty
+        assert restored.columns.tolist() == flat.columns.tolist()